@@ -6,23 +6,41 @@ import base64
 from google import genai
 from google.genai import types
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from src.llm_blocks.transcriber import Transcriber
 from src.llm_blocks.talker import Talker
 from src.llm_blocks.image_understanding import ImageUnderstanding
 from src.llm_blocks.artist import Artist
+from src.llm_blocks.image_hash_index import ImageHashIndex
+from src.llm_blocks.media_pool import prepare_upload, start_media_pool
+from src.llm_blocks.model_router import ModelRouter
 from src.tools.get_attraction_info import get_attraction_info
 from src.tools.get_food_recommendations import get_food_recommendations
 from src.tools.get_transportation_info import get_transportation_info
 from src.tools.get_current_weather_egypt import get_current_weather_egypt
+from src.tools.search_egypt_knowledge import search_egypt_knowledge
+from src.profiling import stage, profile_generator, profile_call
 import io
 import time
 
+# Start the media workers before anything else creates threads
+start_media_pool()
+
 # Initialize API key
 api_key = os.getenv("GEMINI_API_KEY")
 if not api_key:
     raise ValueError("GEMINI_API_KEY environment variable not set.")
 client = genai.Client(api_key=api_key)
 
+# Uploads are downscaled to this longest side before being sent to the model
+MAX_UPLOAD_SIDE = 2048
+
+# Fixed prompt for image-only turns; it must not depend on the session, since its answers are shared
+IMAGE_DESCRIPTION_PROMPT = (
+    "Describe this photo for an Egyptian tourism guide: name any landmark, site, dish or place "
+    "it shows, where in Egypt it is, and notable visible details. Be factual and concise."
+)
+
 # System message for the agent
 SYSTEM_MESSAGE = """You are an expert Egyptian Tourism Guide AI assistant. Your role is to help travelers explore Egypt by providing:
 
@@ -77,6 +95,13 @@ SYSTEM_MESSAGE = """You are an expert Egyptian Tourism Guide AI assistant. Your
     *   **Behavior:** It returns weather information based on whether it is currently summer or a cooler season in Egypt.
     *   **Example Call:** If the user asks, "What's the weather like?", simply call `get_current_weather_egypt()`.
 
+*   **`search_egypt_knowledge(query: str, top_k: int = 3)`**
+    *   **Purpose:** Searches the whole Egypt knowledge base (attractions, food, transportation) by meaning rather than exact name.
+    *   **Parameters:** `query` (string) - A free-form description; `top_k` (integer, optional) - How many matches to return.
+    *   **Behavior:** Returns the closest matching entries with a relevance score.
+    *   **Example Call:** If the user asks about "that temple Ramesses moved", call with `query="temple Ramesses moved"`.
+    *   **When to Use:** Use it when the user describes something vaguely or the other tools don't recognize the name.
+
 Always be helpful, accurate, and culturally respectful. Use the available tools to provide specific information. Keep responses informative but concise. Include relevant emojis to make responses more engaging.
 
 When users upload images, analyze them for Egyptian content and provide relevant tourism advice."""
@@ -84,25 +109,66 @@ When users upload images, analyze them for Egyptian content and provide relevant
 # Initialize components
 transcriber = Transcriber(api_key=api_key)
 talker = Talker(api_key=api_key)
-image_understanding = ImageUnderstanding(api_key=api_key)
+# Near-duplicate photos (Hamming distance <= IMAGE_HASH_MAX_DISTANCE of 64 bits) reuse earlier descriptions;
+# at most IMAGE_HASH_MAX_ENTRIES photos are kept, dropping the least recently used
+image_hash_index = ImageHashIndex(
+    max_distance=int(os.getenv("IMAGE_HASH_MAX_DISTANCE", "6")),
+    max_entries=int(os.getenv("IMAGE_HASH_MAX_ENTRIES", "10000")),
+)
+image_understanding = ImageUnderstanding(api_key=api_key, hash_index=image_hash_index)
 artist = Artist()
+model_router = ModelRouter()
+# Describes photos for the shared hash index off the request path
+describe_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-describe")
 
 
-def create_chat_session():
-    """Creates a new chat session."""
+def create_chat_session(model=ModelRouter.DEFAULT_MODELS["standard"], history=None):
+    """Creates a new chat session, optionally continuing an earlier conversation on another model."""
     return client.chats.create(
-        model="gemini-1.5-flash",
+        model=model,
+        history=history,
         config=types.GenerateContentConfig(
             tools=[
                 get_attraction_info,
                 get_food_recommendations, 
                 get_transportation_info,
-                get_current_weather_egypt
+                get_current_weather_egypt,
+                search_egypt_knowledge
             ],
             system_instruction=SYSTEM_MESSAGE
         )
     )
 
+def upload_part(image_upload):
+    """Returns an uploaded photo as a downscaled, encoded part, prepared in the media pool."""
+    with stage("image_encode"):
+        data, mime_type = prepare_upload(image_upload, max_side=MAX_UPLOAD_SIDE)
+    return types.Part.from_bytes(data=data, mime_type=mime_type)
+
+def _describe_for_cache(image_upload):
+    try:
+        image_understanding.understand_image(image_upload, IMAGE_DESCRIPTION_PROMPT)
+    except Exception as e:
+        print(f"Background image description failed: {e}")
+
+def image_only_content(image_upload):
+    """
+    Returns the chat content standing in for an image sent without text.
+
+    Near-duplicates of earlier photos are sent as their cached description,
+    which was generated with a fixed, session-independent prompt, so the
+    shared hash index can safely reuse it across sessions. On a miss the
+    photo itself goes to the chat as usual, and the description is generated
+    in the background for next time. Either way the turn goes through the
+    chat session, so the answer and the history stay specific to this user.
+    """
+    with stage("image_lookup"):
+        description = image_understanding.cached_description(image_upload, IMAGE_DESCRIPTION_PROMPT)
+    if description is not None:
+        return [f"[The user uploaded a photo. Description of the photo: {description}]"]
+    describe_executor.submit(_describe_for_cache, image_upload)
+    return [upload_part(image_upload)]
+
 def handle_user_message(user_input, chat_history, image_upload, chat_session, tts_on):
     """
     Processes user input (text, audio, image) and streams the response.
@@ -113,19 +179,13 @@ def handle_user_message(user_input, chat_history, image_upload, chat_session, tt
         
         # Handle image upload
         if image_upload:
-            try:
-                pil_image = Image.open(image_upload)
-                content.append(pil_image)
-                # Display the uploaded image in the chat
-                chat_history.append(((image_upload,), None)) 
-                
-                # If there's no text with the image, create a default message
-                if not user_input or not user_input.strip():
-                    display_message = "Analyze this image in the context of Egyptian tourism."
-                    content.append(display_message)
-            except Exception as e:
-                chat_history.append([f"Error processing image: {str(e)}", None])
-                return chat_history, chat_session, None, None
+            # Display the uploaded image in the chat
+            chat_history.append(((image_upload,), None)) 
+            
+            # If there's no text with the image, create a default message
+            image_only = not user_input or not user_input.strip()
+            if image_only:
+                display_message = "Analyze this image in the context of Egyptian tourism."
         elif user_input and user_input.strip():
             content.append(user_input)
         else:
@@ -136,15 +196,41 @@ def handle_user_message(user_input, chat_history, image_upload, chat_session, tt
         chat_history.append([display_message, "🤔 Thinking..."])
         yield chat_history, chat_session, None, None
 
+        if image_upload:
+            try:
+                if image_only:
+                    content.extend(image_only_content(image_upload))
+                    content.append(display_message)
+                else:
+                    # Resize/encode in the media pool so it doesn't hold the GIL on the streaming threads
+                    content.append(upload_part(image_upload))
+            except Exception as e:
+                chat_history[-1] = [f"Error processing image: {str(e)}", None]
+                yield chat_history, chat_session, None, None
+                return
+
         # Send message to Gemini and get response
         try:
-            response = chat_session.send_message_stream(content)
-            assistant_response = ""
-            for chunk in response:
-                if chunk.text:  # Check if chunk has text
-                    assistant_response += chunk.text
-                    chat_history[-1][1] = assistant_response
-                    yield chat_history, chat_session, None, None
+            # Pick the model for this turn and carry the conversation over to it
+            # A cached photo description is plain text, so only an actual image part counts
+            has_image = any(isinstance(part, types.Part) for part in content)
+            model = model_router.route(user_input, has_image=has_image)
+            chat_session = create_chat_session(model, history=chat_session.get_history(curated=True))
+
+            start_time = time.perf_counter()
+            first_token_time = None
+            with stage("model_stream"):
+                response = chat_session.send_message_stream(content)
+                assistant_response = ""
+                for chunk in response:
+                    if chunk.text:  # Check if chunk has text
+                        if first_token_time is None:
+                            first_token_time = time.perf_counter() - start_time
+                        assistant_response += chunk.text
+                        chat_history[-1][1] = assistant_response
+                        yield chat_history, chat_session, None, None
+            total_time = time.perf_counter() - start_time
+            model_router.record_latency(model, first_token_time if first_token_time is not None else total_time, total_time)
         except Exception as e:
             assistant_response = f"❌ An error occurred: {str(e)}"
             chat_history[-1][1] = assistant_response
@@ -155,7 +241,8 @@ def handle_user_message(user_input, chat_history, image_upload, chat_session, tt
         if tts_on and assistant_response and assistant_response.strip():
             try:
                 gr.Info("🔊 Generating audio response...")
-                audio_output = talker.speak(assistant_response)
+                with stage("tts"):
+                    audio_output = talker.speak(assistant_response)
             except Exception as e:
                 gr.Warning(f"Could not generate audio: {e}")
 
@@ -265,6 +352,7 @@ with gr.Blocks(theme=gr.themes.Soft(primary_hue="orange", secondary_hue="blue"),
 
             with gr.Accordion("⚙️ Settings & Actions", open=True):
                 tts_enabled = gr.Checkbox(label="🔊 Enable Text-to-Speech", value=False)
+                voice_turn_enabled = gr.Checkbox(label="🎙️ Voice Turn (send recordings automatically)", value=False)
                 clear_btn = gr.Button("🗑️ Clear Chat History")
             
             tts_output = gr.Audio(label="Assistant's Voice", autoplay=True, visible=False)
@@ -278,11 +366,12 @@ with gr.Blocks(theme=gr.themes.Soft(primary_hue="orange", secondary_hue="blue"),
     tts_message_outputs = [chatbot, chat_session, image_upload, tts_output]
 
     # Main chat submission logic
-    def submit_and_clear(user_input, chat_history, image_upload, chat_session, tts_enabled):
+    def submit_and_clear(user_input, chat_history, image_upload, chat_session, tts_enabled, request: gr.Request):
         # Process the message
         last_result = None
         try:
-            for result in handle_user_message(user_input, chat_history, image_upload, chat_session, tts_enabled):
+            # Profiled only when "X-Profile" or "?profile=" carries PROFILE_REQUEST_TOKEN, or by PROFILE_SAMPLE_RATE
+            for result in profile_generator(handle_user_message(user_input, chat_history, image_upload, chat_session, tts_enabled), request):
                 last_result = result
                 yield result
             # Clear the image_upload after processing (if we got any results)
@@ -312,12 +401,12 @@ with gr.Blocks(theme=gr.themes.Soft(primary_hue="orange", secondary_hue="blue"),
     )
 
     # AI Art Generator
-    def generate_art(prompt):
+    def generate_art(prompt, request: gr.Request):
         if not prompt or not prompt.strip():
             raise gr.Error("Please enter a prompt for the image.")
         try:
             gr.Info("🎨 Generating your masterpiece...")
-            image_path = artist.generate_image(prompt)
+            image_path = profile_call(request, "art", artist.generate_image_file, prompt)
             return image_path
         except Exception as e:
             raise gr.Error(f"Failed to generate image: {e}")
@@ -329,11 +418,11 @@ with gr.Blocks(theme=gr.themes.Soft(primary_hue="orange", secondary_hue="blue"),
     )
     
     # Quick Actions
-    def handle_quick_question(question, chat_history, chat_session, tts_on):
+    def handle_quick_question(question, chat_history, chat_session, tts_on, request: gr.Request):
         if not question:
             return chat_history, chat_session, None, None
         # Re-use the main message handler for quick questions
-        for response in handle_user_message(question, chat_history, None, chat_session, tts_on):
+        for response in profile_generator(handle_user_message(question, chat_history, None, chat_session, tts_on), request):
             yield response
 
     ask_quick_btn.click(
@@ -342,23 +431,61 @@ with gr.Blocks(theme=gr.themes.Soft(primary_hue="orange", secondary_hue="blue"),
         tts_message_outputs
     )
     
-    # Audio Transcription
-    def transcribe_audio(audio_file):
-        if audio_file:
-            try:
-                gr.Info("🎤 Transcribing audio...")
-                # Fixed method call - using .transcribe instead of .transcribe_audio
-                transcribed_text = transcriber.transcribe(audio_file)
-                return transcribed_text if transcribed_text else ""
-            except Exception as e:
-                gr.Error(f"Audio transcription failed: {e}")
-                return ""
-        return ""
-        
+    # Audio Input
+    def handle_audio_input(audio_file, chat_history, image_upload, chat_session, tts_on, voice_turn_on, request: gr.Request):
+        yield from profile_generator(
+            _handle_audio_input(audio_file, chat_history, image_upload, chat_session, tts_on, voice_turn_on), request, "voice"
+        )
+
+    def _handle_audio_input(audio_file, chat_history, image_upload, chat_session, tts_on, voice_turn_on):
+        """
+        Transcribes a recording, streaming partial transcripts. In voice-turn mode the
+        transcript is sent straight to handle_user_message in the same event.
+        """
+        if not audio_file:
+            yield gr.update(), chat_history, chat_session, image_upload, None
+            return
+
+        transcript = ""
+        live_row = None
+        try:
+            with stage("transcribe"):
+                for transcript in transcriber.transcribe_stream(audio_file):
+                    if voice_turn_on:
+                        if live_row is None:
+                            live_row = ["", "🎧 Listening..."]
+                            chat_history.append(live_row)
+                        live_row[0] = f"🎤 {transcript}"
+                        yield gr.update(), chat_history, chat_session, image_upload, None
+                    else:
+                        yield transcript, chat_history, chat_session, image_upload, None
+        except Exception as e:
+            gr.Warning(f"Audio transcription failed: {e}")
+            # Never send a truncated transcript to the model
+            if live_row is not None:
+                chat_history.remove(live_row)
+            # Also clear any partial transcript already streamed into the textbox
+            yield gr.update() if voice_turn_on else "", chat_history, chat_session, image_upload, None
+            return
+
+        transcript = transcript.strip()
+        if not voice_turn_on:
+            yield transcript, chat_history, chat_session, image_upload, None
+            return
+
+        # Replace the live transcript row with the real turn
+        if live_row is not None:
+            chat_history.remove(live_row)
+        if not transcript:
+            yield "", chat_history, chat_session, image_upload, None
+            return
+        for history, session, _, audio_output in handle_user_message(transcript, chat_history, image_upload, chat_session, tts_on):
+            yield "", history, session, None, audio_output
+
     audio_input.change(
-        transcribe_audio,
-        [audio_input],
-        [text_input],
+        handle_audio_input,
+        [audio_input, chatbot, image_upload, chat_session, tts_enabled, voice_turn_enabled],
+        [text_input] + tts_message_outputs,
     )
 
 
@@ -0,0 +1,248 @@
+"""
+Offline microbenchmarks for the catalog tools, media paths and chat streaming loop.
+
+Usage:
+    python -m benchmarks.run_benchmarks --save benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --compare benchmarks/baseline.json --threshold 15
+
+No network access or real API key is needed: the chat loop is driven by a fake
+client and the catalogs are scaled with synthetic entries.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+# app2 refuses to import without a key; the fake client below never uses it
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def measure(fn, repeat: int = 5, number: int = 1) -> dict:
+    """
+    Times fn, discarding one warm-up run.
+
+    Args:
+        fn: The callable to time.
+        repeat (int): Number of timed rounds. Defaults to 5.
+        number (int): Calls per round. Defaults to 1.
+
+    Returns:
+        dict: Median and minimum seconds per call, plus the number of rounds.
+    """
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+    return {"median_s": statistics.median(timings), "min_s": min(timings), "rounds": repeat}
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow the tools' and router's console prints while timing."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+@contextlib.contextmanager
+def scaled_catalog(catalog: dict, size: int):
+    """Temporarily grow a catalog dict in place to `size` entries by cloning its first entry."""
+    original = dict(catalog)
+    template = next(iter(original.values()))
+    try:
+        for i in range(size - len(original)):
+            catalog[f"synthetic_{i}"] = {**template, "name": f"Synthetic Site {i}"}
+        yield catalog
+    finally:
+        catalog.clear()
+        catalog.update(original)
+
+
+def bench_catalog_tools(sizes: list) -> dict:
+    from src.tools.get_attraction_info import EGYPTIAN_ATTRACTIONS, get_attraction_info
+    from src.tools.get_food_recommendations import EGYPTIAN_CUISINE, get_food_recommendations
+    from src.tools.get_transportation_info import TRANSPORTATION_INFO, get_transportation_info
+    from src.tools.search_egypt_knowledge import KnowledgeIndex, build_catalog_entries
+
+    results = {}
+    for size in sizes:
+        repeat = 5 if size <= 10000 else 3
+        with quiet():
+            with scaled_catalog(EGYPTIAN_ATTRACTIONS, size):
+                # A miss scans the whole catalog, which is the worst case
+                results[f"tools.attraction_miss.{size}"] = measure(lambda: get_attraction_info("Siwa Oasis"), repeat)
+            with scaled_catalog(EGYPTIAN_CUISINE, size):
+                results[f"tools.food_list.{size}"] = measure(lambda: get_food_recommendations(), repeat)
+            with scaled_catalog(TRANSPORTATION_INFO, size):
+                results[f"tools.transport_miss.{size}"] = measure(lambda: get_transportation_info("Felucca"), repeat)
+
+        index = KnowledgeIndex()
+        entries = build_catalog_entries()
+        entries += [
+            {"category": "Attraction", "name": f"Synthetic Site {i}", "text": f"synthetic site {i} desert oasis temple", "details": ""}
+            for i in range(size - len(entries))
+        ]
+        index.add_entries(entries)
+        results[f"tools.semantic_search.{size}"] = measure(lambda: index.search("that temple Ramesses moved"), repeat, number=10)
+    return results
+
+
+def bench_image_ingestion(sizes: list) -> dict:
+    from PIL import Image
+    from src.llm_blocks.media_pool import prepare_upload
+
+    max_side = 2048  # Matches MAX_UPLOAD_SIDE in app2.py
+    results = {}
+    for width, height in sizes:
+        buffer = io.BytesIO()
+        # A smooth gradient compresses much more like a real photo than random noise does
+        Image.linear_gradient("L").resize((width, height)).convert("RGB").save(buffer, "JPEG", quality=90)
+        data = buffer.getvalue()
+        results[f"image.ingest.{width}x{height}"] = measure(lambda: prepare_upload(data, max_side=max_side))
+    return results
+
+
+def bench_wav_encoding(seconds_of_audio: list) -> dict:
+    from src.llm_blocks.talker import Talker
+
+    # _write_wave_file doesn't touch the client, so skip __init__ (and its API client)
+    talker = Talker.__new__(Talker)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.wav")
+        for seconds in seconds_of_audio:
+            pcm = bytes(24000 * 2 * seconds)  # 24 kHz, 16-bit mono, as returned by the TTS model
+            results[f"audio.write_wave.{seconds}s"] = measure(lambda: talker._write_wave_file(path, pcm))
+    return results
+
+
+class _FakeChat:
+    """Stands in for a google-genai Chat, streaming a canned answer."""
+    def __init__(self, chunks: list):
+        self.chunks = chunks
+
+    def get_history(self, curated: bool = False):
+        return []
+
+    def send_message_stream(self, content):
+        for chunk in self.chunks:
+            yield SimpleNamespace(text=chunk)
+
+
+class _FakeClient:
+    def __init__(self, chunks: list):
+        self.chats = SimpleNamespace(create=lambda **kwargs: _FakeChat(chunks))
+
+
+def bench_chat_stream(chunk_counts: list) -> dict:
+    import app2
+
+    results = {}
+    original_client = app2.client
+    try:
+        for count in chunk_counts:
+            chunks = ["Koshari is Egypt's national dish. "] * count
+            app2.client = _FakeClient(chunks)
+            session = app2.create_chat_session()
+
+            def run_turn():
+                for _ in app2.handle_user_message("What is Koshari?", [], None, session, False):
+                    pass
+
+            with quiet():
+                results[f"chat.stream.{count}_chunks"] = measure(run_turn, number=5)
+    finally:
+        app2.client = original_client
+    return results
+
+
+SUITES = {
+    "tools": lambda: bench_catalog_tools([1000, 100000]),
+    "image": lambda: bench_image_ingestion([(640, 480), (1920, 1080), (4032, 3024)]),
+    "audio": lambda: bench_wav_encoding([1, 10, 60]),
+    "chat": lambda: bench_chat_stream([10, 200]),
+}
+
+
+def compare(results: dict, baseline: dict, threshold_pct: float) -> list:
+    """
+    Compares median timings against a baseline.
+
+    Args:
+        results (dict): Current benchmark results.
+        baseline (dict): Results loaded from a baseline file.
+        threshold_pct (float): Slowdown (in percent) above which a benchmark is flagged.
+
+    Returns:
+        list: Names of the benchmarks that regressed.
+    """
+    regressions = []
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"  NEW     {name}: {current['median_s'] * 1000:.3f} ms")
+            continue
+        change = (current["median_s"] - previous["median_s"]) / previous["median_s"] * 100
+        status = "REGRESS" if change > threshold_pct else "ok"
+        print(f"  {status:<8}{name}: {previous['median_s'] * 1000:.3f} -> {current['median_s'] * 1000:.3f} ms ({change:+.1f}%)")
+        if status == "REGRESS":
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the offline microbenchmarks.")
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES), help="Suite to run (repeatable). Defaults to all.")
+    parser.add_argument("--save", metavar="PATH", nargs="?", const=DEFAULT_BASELINE, help="Write results as a JSON baseline.")
+    parser.add_argument("--compare", metavar="PATH", nargs="?", const=DEFAULT_BASELINE, help="Compare against a JSON baseline.")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent. Defaults to 10.")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for suite in args.suite or list(SUITES):
+        print(f"Running {suite} benchmarks...")
+        results.update(SUITES[suite]())
+
+    for name, result in sorted(results.items()):
+        print(f"  {name}: {result['median_s'] * 1000:.3f} ms (min {result['min_s'] * 1000:.3f} ms)")
+
+    regressions = []
+    if args.compare:
+        # Read the baseline before --save can overwrite the same file
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        print(f"Comparing against {args.compare} (threshold {args.threshold:.1f}%):")
+        regressions = compare(results, baseline, args.threshold)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            }, f, indent=2)
+        print(f"Baseline saved to: {args.save}")
+
+    if args.compare:
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+            return 1
+        print("No regressions.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
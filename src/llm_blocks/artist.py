@@ -5,7 +5,10 @@ from together import Together
 from IPython.display import Image as DisplayImage, display
 from dotenv import load_dotenv
 import os
+import tempfile
+import uuid
 from datetime import datetime
+from src.profiling import stage
 
 load_dotenv()
 
@@ -13,27 +16,22 @@ class Artist:
     """
     A class to handle text-to-image generation using the Together API.
     """
-    def __init__(self, output_dir: str = "generated_images"):
+    def __init__(self, output_dir: str = "generated_images", chunk_size: int = 64 * 1024):
         """
         Initializes the Artist class.
 
         Args:
             output_dir (str): Directory where generated images will be saved. Defaults to "generated_images".
+            chunk_size (int): Download chunk size in bytes. Defaults to 64 KiB.
         """
         self.output_dir = output_dir
+        self.chunk_size = chunk_size
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
 
-    def generate_image(self, prompt: str, save_image: bool = True) -> Image.Image:
+    def _request_image(self, prompt: str) -> str:
         """
-        Generates an image based on a text prompt and optionally saves it.
-
-        Args:
-            prompt (str): The text prompt for image generation.
-            save_image (bool): Whether to save the generated image. Defaults to True.
-
-        Returns:
-            PIL.Image.Image: The generated image.
+        Asks the Together API for an image and returns its download URL.
         """
         client = Together()
 
@@ -43,23 +41,120 @@ class Artist:
             steps=4
         )
 
-        img_url = response.data[0].url
-        img_data = requests.get(img_url).content
-        image = Image.open(BytesIO(img_data))
+        return response.data[0].url
+
+    def _stream_download(self, img_url: str, sink) -> int:
+        """
+        Streams an image download into a writable file-like object chunk by chunk.
+
+        The response body is only read as fast as the chunks are written, so a
+        slow sink applies back-pressure instead of the whole image piling up in
+        memory.
+
+        Args:
+            img_url (str): The image URL.
+            sink: A writable binary file-like object.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        total_bytes = 0
+        with requests.get(img_url, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            # Generic binary responses are allowed; their format is checked from the bytes afterwards
+            if content_type not in ("", "application/octet-stream") and not content_type.startswith("image/"):
+                raise ValueError(f"Expected an image download but got '{content_type}'.")
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                sink.write(chunk)
+                total_bytes += len(chunk)
+        return total_bytes
+
+    def _download_to_file(self, prompt: str) -> tuple:
+        """
+        Generates an image and streams its original encoded bytes into output_dir.
+
+        Returns:
+            tuple: (filepath, total_bytes).
+        """
+        img_url = self._request_image(prompt)
+
+        # Generate filename using timestamp and sanitized prompt
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        safe_prompt = "".join(c if c.isalnum() else "_" for c in prompt[:30])
+
+        # A unique temp file, so concurrent generations of the same prompt can't clash
+        partial = tempfile.NamedTemporaryFile(dir=self.output_dir, prefix=f"{timestamp}_", suffix=".part", delete=False)
+        try:
+            with stage("art_download"), partial:
+                total_bytes = self._stream_download(img_url, partial)
+            # Only the header is read here; the real format decides the extension
+            with Image.open(partial.name) as image:
+                image_format = image.format
+            extension = {"JPEG": ".jpg"}.get(image_format, f".{image_format.lower()}")
+            filepath = os.path.join(self.output_dir, f"{timestamp}_{safe_prompt}_{uuid.uuid4().hex[:8]}{extension}")
+            # Only publish complete files
+            os.replace(partial.name, filepath)
+        except BaseException:
+            if os.path.exists(partial.name):
+                os.remove(partial.name)
+            raise
 
+        return filepath, total_bytes
+
+    def generate_image_file(self, prompt: str) -> str:
+        """
+        Generates an image and streams the original encoded bytes straight to disk.
+
+        The image is neither decoded nor re-encoded, so the path can be shown as
+        soon as the download finishes.
+
+        Args:
+            prompt (str): The text prompt for image generation.
+
+        Returns:
+            str: The path of the saved image.
+        """
+        filepath, total_bytes = self._download_to_file(prompt)
+
+        # At most one chunk of the download is held in memory at a time
+        print(f"Image saved to: {filepath} ({total_bytes} bytes written, {self.chunk_size} bytes buffered at once)")
+        return filepath
+
+    def generate_image(self, prompt: str, save_image: bool = True) -> Image.Image:
+        """
+        Generates an image based on a text prompt and optionally saves it.
+
+        Args:
+            prompt (str): The text prompt for image generation.
+            save_image (bool): Whether to save the generated image. Defaults to True.
+
+        Returns:
+            PIL.Image.Image: The generated image.
+        """
         if save_image:
-            # Generate filename using timestamp and sanitized prompt
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            safe_prompt = "".join(c if c.isalnum() else "_" for c in prompt[:30])
-            filename = f"{timestamp}_{safe_prompt}.png"
-            filepath = os.path.join(self.output_dir, filename)
-            
-            # Save the image
-            image.save(filepath)
-            print(f"Image saved to: {filepath}")
+            source, total_bytes = self._download_to_file(prompt)
+            buffered_bytes = self.chunk_size
+            print(f"Image saved to: {source}")
+        else:
+            source = BytesIO()
+            with stage("art_download"):
+                total_bytes = self._stream_download(self._request_image(prompt), source)
+            # The whole encoded image stays in the buffer
+            buffered_bytes = total_bytes
+            source.seek(0)
+
+        # Decode once, straight from the file or download buffer
+        with stage("art_decode"):
+            image = Image.open(source)
+            image.load()
 
+        decoded_bytes = image.width * image.height * len(image.getbands())
+        print(f"Image memory: {total_bytes} encoded bytes downloaded, {buffered_bytes} bytes buffered at once, "
+              f"{decoded_bytes} bytes of decoded pixels ({image.mode} {image.width}x{image.height})")
         return image
 
+
 if __name__ == '__main__':
     # Example Usage
     artist_generator = Artist()
@@ -0,0 +1,176 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+
+def difference_hash(image, hash_size: int = 8) -> int:
+    """
+    Computes a perceptual difference hash (dHash) of an image.
+
+    Args:
+        image: A PIL image or a path to an image file.
+        hash_size (int): Hash side length; the hash has hash_size**2 bits. Defaults to 8.
+
+    Returns:
+        int: The hash as an unsigned integer.
+    """
+    if not isinstance(image, Image.Image):
+        with Image.open(image) as opened:
+            return difference_hash(opened, hash_size)
+
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """
+    A Burkhard-Keller tree for Hamming-distance range queries over integer hashes.
+    """
+    def __init__(self):
+        self.root = None
+
+    def add(self, key: int, value):
+        """
+        Adds a hash to the tree, replacing the value if the exact hash is already present.
+
+        Args:
+            key (int): The hash.
+            value: The payload stored with the hash.
+        """
+        if self.root is None:
+            self.root = [key, value, {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(key, node[0])
+            if distance == 0:
+                node[1] = value
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [key, value, {}]
+                return
+            node = child
+
+    def search(self, key: int, max_distance: int) -> list:
+        """
+        Finds all stored hashes within max_distance of key.
+
+        Args:
+            key (int): The query hash.
+            max_distance (int): Maximum Hamming distance (inclusive).
+
+        Returns:
+            list: (distance, key, value) tuples sorted by distance.
+        """
+        if self.root is None:
+            return []
+        matches = []
+        stack = [self.root]
+        while stack:
+            node_key, value, children = stack.pop()
+            distance = hamming_distance(key, node_key)
+            if distance <= max_distance:
+                matches.append((distance, node_key, value))
+            # Triangle inequality: only children in this band can be close enough
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+
+class ImageHashIndex:
+    """
+    A cache of image analyses keyed by perceptual hash, so near-duplicate photos reuse an earlier answer.
+
+    The index holds at most max_entries distinct hashes. Once that is exceeded,
+    the least recently used tenth is dropped and the BK-tree is rebuilt, since
+    BK-trees don't support removal.
+    """
+    def __init__(self, max_distance: int = 6, hash_size: int = 8, max_entries: int = 10000):
+        """
+        Initializes the ImageHashIndex class.
+
+        Args:
+            max_distance (int): Largest Hamming distance still treated as the same photo. Defaults to 6 (of 64 bits).
+            hash_size (int): dHash side length. Defaults to 8.
+            max_entries (int): Maximum number of distinct image hashes kept. Defaults to 10000.
+        """
+        self.max_distance = max_distance
+        self.hash_size = hash_size
+        self.max_entries = max(1, max_entries)
+        self._tree = BKTree()
+        # hash -> {prompt: description}, least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def hash_image(self, image) -> int:
+        """Computes the perceptual hash used by this index."""
+        return difference_hash(image, self.hash_size)
+
+    def lookup(self, image, prompt: str = "", image_hash: int = None):
+        """
+        Returns the cached description of the closest near-duplicate image.
+
+        Args:
+            image: A PIL image or a path to an image file.
+            prompt (str): The prompt the description must have been generated for.
+            image_hash (int): A precomputed hash, to skip hashing the image again.
+
+        Returns:
+            str | None: The cached description, or None on a miss.
+        """
+        if image_hash is None:
+            image_hash = self.hash_image(image)
+        with self._lock:
+            for distance, key, _ in self._tree.search(image_hash, self.max_distance):
+                descriptions = self._entries[key]
+                if prompt in descriptions:
+                    self._entries.move_to_end(key)
+                    print(f"Image cache hit at Hamming distance {distance}")
+                    return descriptions[prompt]
+        return None
+
+    def add(self, image, description: str, prompt: str = "", image_hash: int = None):
+        """
+        Stores the description generated for an image.
+
+        Args:
+            image: A PIL image or a path to an image file.
+            description (str): The generated description.
+            prompt (str): The prompt the description was generated for.
+            image_hash (int): A precomputed hash, to skip hashing the image again.
+        """
+        if image_hash is None:
+            image_hash = self.hash_image(image)
+        with self._lock:
+            if image_hash in self._entries:
+                self._entries[image_hash][prompt] = description
+                self._entries.move_to_end(image_hash)
+                return
+            self._entries[image_hash] = {prompt: description}
+            self._tree.add(image_hash, None)
+            if len(self._entries) > self.max_entries:
+                self._trim()
+
+    def _trim(self):
+        """Drops the least recently used entries and rebuilds the tree. Caller holds the lock."""
+        keep = max(1, self.max_entries * 9 // 10)
+        while len(self._entries) > keep:
+            self._entries.popitem(last=False)
+        self._tree = BKTree()
+        for key in self._entries:
+            self._tree.add(key, None)
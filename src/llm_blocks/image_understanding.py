@@ -1,18 +1,41 @@
 from google import genai
 from google.genai import types
+from src.llm_blocks.image_hash_index import ImageHashIndex
+from src.llm_blocks.media_pool import load_image
 
 class ImageUnderstanding:
     """
     A class to handle image-to-text generation using the Google Generative AI API.
     """
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, hash_index: ImageHashIndex = None):
         """
         Initializes the ImageCaptioner class.
 
         Args:
             api_key (str): Your Google Generative AI API key.
+            hash_index (ImageHashIndex): Cache used to reuse answers for near-duplicate images. Defaults to a new ImageHashIndex.
         """
         self.client = genai.Client(api_key=api_key)
+        self.hash_index = hash_index if hash_index is not None else ImageHashIndex()
+
+    def _hash(self, file_path: str) -> tuple:
+        # A small decode is plenty for the perceptual hash
+        thumbnail = load_image(file_path, max_side=256)
+        return thumbnail, self.hash_index.hash_image(thumbnail)
+
+    def cached_description(self, file_path: str, prompt: str):
+        """
+        Looks up the caption of a near-duplicate image without calling the model.
+
+        Args:
+            file_path (str): The path to the image file.
+            prompt (str): The prompt the caption must have been generated for.
+
+        Returns:
+            str | None: The cached caption, or None on a miss.
+        """
+        thumbnail, image_hash = self._hash(file_path)
+        return self.hash_index.lookup(thumbnail, prompt, image_hash=image_hash)
 
     def understand_image(self, file_path: str, prompt: str) -> str:
         """
@@ -25,6 +48,11 @@ class ImageUnderstanding:
         Returns:
             str: The generated text caption.
         """
+        thumbnail, image_hash = self._hash(file_path)
+        cached = self.hash_index.lookup(thumbnail, prompt, image_hash=image_hash)
+        if cached is not None:
+            return cached
+
         my_file = self.client.files.upload(file=file_path)
 
         response = self.client.models.generate_content(
@@ -35,6 +63,9 @@ class ImageUnderstanding:
         # Delete the uploaded file after use
         self.client.files.delete(name=my_file.name)
 
+        if response.text:
+            self.hash_index.add(thumbnail, response.text, prompt, image_hash=image_hash)
+
         return response.text
 
 if __name__ == '__main__':
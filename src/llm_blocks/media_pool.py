@@ -0,0 +1,254 @@
+import io
+import multiprocessing
+import os
+import sys
+import threading
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from PIL import Image
+
+# Number of worker processes for CPU-heavy media work; 0 runs everything inline
+MEDIA_POOL_WORKERS = int(os.getenv("MEDIA_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Larger images are rejected before decoding, so a decompression bomb can't exhaust a worker's memory
+MEDIA_MAX_IMAGE_PIXELS = int(os.getenv("MEDIA_MAX_IMAGE_PIXELS", "50000000"))
+
+# Upload formats the model accepts as they are
+_UPLOAD_FORMATS = ("JPEG", "PNG", "WEBP")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _start_method() -> str:
+    """
+    Picks how worker processes are started.
+
+    fork is only safe while this is the only thread, since a child inherits
+    any lock another thread holds at that moment. Later (or off Linux) workers
+    are spawned instead, which re-imports the entry script in each worker, so
+    this module keeps its own imports light.
+    """
+    if sys.platform.startswith("linux") and threading.active_count() == 1:
+        return "fork"
+    return "spawn"
+
+
+def get_media_pool():
+    """Return the shared process pool, creating it on first use (None when disabled)."""
+    global _pool
+    # Workers never start pools of their own (spawned workers re-import the entry script)
+    if MEDIA_POOL_WORKERS <= 0 or multiprocessing.current_process().name != "MainProcess":
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # Workers must share the parent's tracker, or they'd report its shared blocks as leaked
+            resource_tracker.ensure_running()
+            _pool = ProcessPoolExecutor(
+                max_workers=MEDIA_POOL_WORKERS,
+                mp_context=multiprocessing.get_context(_start_method()),
+            )
+        return _pool
+
+
+def _discard_pool(pool):
+    """Forgets a broken pool so the next get_media_pool() starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _noop():
+    return None
+
+
+def start_media_pool():
+    """
+    Creates the pool and its workers now.
+
+    Call this at startup, before the web server starts any threads, so the
+    workers can be forked safely and cheaply.
+    """
+    pool = get_media_pool()
+    if pool is not None:
+        # A fork-based pool launches all of its workers on the first submit
+        pool.submit(_noop).result()
+    return pool
+
+
+def _run_shared(task, name: str, size: int, args: tuple):
+    """Worker side: run task on the shared input buffer and publish its output in a new shared block."""
+    shm = SharedMemory(name=name)
+    try:
+        with shm.buf[:size] as view:
+            output, meta = task(view, *args)
+    finally:
+        shm.close()
+
+    if not output:
+        return None, 0, meta
+    out = SharedMemory(create=True, size=len(output))
+    out.buf[:len(output)] = output
+    out.close()
+    return out.name, len(output), meta
+
+
+def run_media_task(task, payload: bytes, *args):
+    """
+    Runs a media task in the shared process pool, passing data through shared memory.
+
+    The payload and the task's output are copied into shared-memory blocks
+    instead of being pickled through the pool's pipes.
+
+    Args:
+        task: A module-level function taking (buffer, *args) and returning (output_bytes, meta).
+        payload (bytes): The input data.
+        *args: Extra picklable arguments for the task.
+
+    Returns:
+        tuple: (output_bytes, meta) as returned by the task.
+    """
+    pool = get_media_pool()
+    if pool is None:
+        return task(memoryview(payload), *args)
+    try:
+        return _submit_shared(pool, task, payload, args)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed by the OS); replace the pool and retry once
+        print("Media pool broken, restarting it")
+        _discard_pool(pool)
+        pool = get_media_pool()
+        if pool is None:
+            return task(memoryview(payload), *args)
+        try:
+            return _submit_shared(pool, task, payload, args)
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            raise
+
+
+def _submit_shared(pool, task, payload: bytes, args: tuple):
+    shm = SharedMemory(create=True, size=max(len(payload), 1))
+    try:
+        shm.buf[:len(payload)] = payload
+        name, size, meta = pool.submit(_run_shared, task, shm.name, len(payload), args).result()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    if name is None:
+        return b"", meta
+    out = SharedMemory(name=name)
+    try:
+        output = bytes(out.buf[:size])
+    finally:
+        out.close()
+        out.unlink()
+    return output, meta
+
+
+def _check_pixels(image):
+    if image.width * image.height > MEDIA_MAX_IMAGE_PIXELS:
+        raise ValueError(
+            f"Image is too large ({image.width}x{image.height}); at most {MEDIA_MAX_IMAGE_PIXELS} pixels are accepted."
+        )
+
+
+def _decode_image(data, max_side):
+    with Image.open(io.BytesIO(data)) as image:
+        _check_pixels(image)
+        if max_side and max(image.size) > max_side:
+            image.draft("RGB", (max_side, max_side))
+            image.thumbnail((max_side, max_side))
+        mode = "RGBA" if "A" in image.getbands() else "RGB"
+        image = image.convert(mode)
+        return image.tobytes(), (mode, image.size)
+
+
+def _encode_upload(data, max_side, quality):
+    with Image.open(io.BytesIO(data)) as image:
+        _check_pixels(image)
+        # Small enough uploads in a format the model accepts are sent as they are
+        if image.format in _UPLOAD_FORMATS and max(image.size) <= max_side:
+            return b"", Image.MIME[image.format]
+        image.draft("RGB", (max_side, max_side))
+        image.thumbnail((max_side, max_side))
+        buffer = io.BytesIO()
+        if "A" in image.getbands():
+            image.convert("RGBA").save(buffer, "PNG")
+            return buffer.getvalue(), "image/png"
+        image.convert("RGB").save(buffer, "JPEG", quality=quality)
+        return buffer.getvalue(), "image/jpeg"
+
+
+def _encode_wave(data, filename, channels, rate, sample_width):
+    with wave.open(filename, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(sample_width)
+        wf.setframerate(rate)
+        wf.writeframes(data)
+    return b"", filename
+
+
+def load_image(source, max_side: int = None) -> Image.Image:
+    """
+    Decodes (and optionally downscales) an image in the media pool.
+
+    Args:
+        source: A file path or the encoded image bytes.
+        max_side (int): If set, the image is shrunk so its longest side is at most this many pixels.
+
+    Returns:
+        PIL.Image.Image: The decoded RGB or RGBA image.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        data = source
+    else:
+        with open(source, "rb") as f:
+            data = f.read()
+    pixels, (mode, size) = run_media_task(_decode_image, data, max_side)
+    return Image.frombytes(mode, size, pixels)
+
+
+def prepare_upload(source, max_side: int, quality: int = 90) -> tuple:
+    """
+    Downscales and encodes an image for sending to the model, in the media pool.
+
+    Uploads already within max_side in JPEG, PNG or WebP are passed through
+    untouched; anything else is shrunk and re-encoded as JPEG (PNG if it has
+    transparency), so only compressed bytes ever cross the process boundary.
+
+    Args:
+        source: A file path or the encoded image bytes.
+        max_side (int): Longest side, in pixels, of the image sent to the model.
+        quality (int): JPEG quality for re-encoded images. Defaults to 90.
+
+    Returns:
+        tuple: (encoded_bytes, mime_type).
+    """
+    if isinstance(source, (bytes, bytearray)):
+        data = source
+    else:
+        with open(source, "rb") as f:
+            data = f.read()
+    encoded, mime_type = run_media_task(_encode_upload, data, max_side, quality)
+    return encoded or bytes(data), mime_type
+
+
+def write_wave_file(filename: str, pcm_data: bytes, channels: int = 1, rate: int = 24000, sample_width: int = 2):
+    """
+    Writes PCM audio data to a WAV file in the media pool.
+
+    Args:
+        filename (str): The name of the output WAV file.
+        pcm_data (bytes): The PCM audio data.
+        channels (int): Number of audio channels.
+        rate (int): Frame rate (samples per second).
+        sample_width (int): Sample width in bytes.
+    """
+    run_media_task(_encode_wave, pcm_data, filename, channels, rate, sample_width)
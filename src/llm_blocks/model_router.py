@@ -0,0 +1,121 @@
+import re
+import threading
+
+
+class ModelRouter:
+    """
+    A class to pick a Gemini model per chat turn using cheap local heuristics.
+
+    Short lookups go to the lightest model, image and planning turns to the
+    strongest one, and everything else to the standard model. Decisions and
+    per-model latencies are printed so the thresholds can be tuned.
+    """
+    DEFAULT_MODELS = {
+        "light": "gemini-1.5-flash-8b",
+        "standard": "gemini-1.5-flash",
+        "heavy": "gemini-1.5-pro",
+    }
+    PLANNING_KEYWORDS = (
+        "itinerary", "plan", "planning", "schedule", "compare", "budget", "honeymoon",
+    )
+    # Common in simple lookups too ("how long is the trip to Giza?"), so it takes two of them
+    TRIP_KEYWORDS = ("trip", "route", "tour", "week", "days")
+    LOOKUP_KEYWORDS = (
+        "weather", "price", "ticket", "cost", "how much", "what is", "where is",
+        "open", "hours", "metro", "uber",
+    )
+
+    def __init__(self, models: dict = None, light_max_words: int = 12, heavy_min_words: int = 40):
+        """
+        Initializes the ModelRouter class.
+
+        Args:
+            models (dict): Model name per tier ("light", "standard", "heavy"). Defaults to DEFAULT_MODELS.
+            light_max_words (int): Longest lookup (in words) still sent to the light model. Defaults to 12.
+            heavy_min_words (int): Shortest message (in words) always sent to the heavy model. Defaults to 40.
+        """
+        self.models = {**self.DEFAULT_MODELS, **(models or {})}
+        self.light_max_words = light_max_words
+        self.heavy_min_words = heavy_min_words
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    def classify(self, user_input: str, has_image: bool = False) -> str:
+        """
+        Classifies a turn into a tier.
+
+        Args:
+            user_input (str): The user's message.
+            has_image (bool): Whether the turn includes an image.
+
+        Returns:
+            str: "light", "standard" or "heavy".
+        """
+        text = (user_input or "").lower()
+        words = re.findall(r"\w+", text)
+
+        if has_image or len(words) >= self.heavy_min_words:
+            return "heavy"
+        if any(keyword in words for keyword in self.PLANNING_KEYWORDS) or re.search(r"\d+\s*-?\s*days?", text):
+            return "heavy"
+        if sum(keyword in words for keyword in self.TRIP_KEYWORDS) >= 2:
+            return "heavy"
+        if len(words) <= self.light_max_words and (
+            len(words) <= 4 or any(keyword in text for keyword in self.LOOKUP_KEYWORDS)
+        ):
+            return "light"
+        return "standard"
+
+    def route(self, user_input: str, has_image: bool = False) -> str:
+        """
+        Picks the model for a turn and logs the decision.
+
+        Args:
+            user_input (str): The user's message.
+            has_image (bool): Whether the turn includes an image.
+
+        Returns:
+            str: The model name to use.
+        """
+        tier = self.classify(user_input, has_image)
+        model = self.models[tier]
+        print(f"Router: tier={tier} model={model} words={len((user_input or '').split())} image={has_image}")
+        return model
+
+    def record_latency(self, model: str, first_token_s: float, total_s: float):
+        """
+        Records and logs the latency of one turn.
+
+        Args:
+            model (str): The model that served the turn.
+            first_token_s (float): Seconds until the first streamed chunk.
+            total_s (float): Seconds until the stream finished.
+        """
+        with self._lock:
+            stats = self._latencies.setdefault(model, {"turns": 0, "first_token_s": 0.0, "total_s": 0.0})
+            stats["turns"] += 1
+            stats["first_token_s"] += first_token_s
+            stats["total_s"] += total_s
+            turns = stats["turns"]
+            mean_first, mean_total = stats["first_token_s"] / turns, stats["total_s"] / turns
+        print(
+            f"Router: model={model} first_token={first_token_s:.2f}s total={total_s:.2f}s "
+            f"(mean over {turns} turns: {mean_first:.2f}s / {mean_total:.2f}s)"
+        )
+
+    def latency_stats(self) -> dict:
+        """
+        Returns mean latencies per model.
+
+        Returns:
+            dict: {model: {"turns", "mean_first_token_s", "mean_total_s"}}.
+        """
+        with self._lock:
+            return {
+                model: {
+                    "turns": stats["turns"],
+                    "mean_first_token_s": stats["first_token_s"] / stats["turns"],
+                    "mean_total_s": stats["total_s"] / stats["turns"],
+                }
+                for model, stats in self._latencies.items()
+            }
@@ -1,8 +1,9 @@
-import wave
 import simpleaudio as sa
 import base64
 from google import genai
 from google.genai import types
+from src.llm_blocks.media_pool import write_wave_file
+from src.profiling import stage
 
 class Talker:
     """
@@ -19,7 +20,7 @@ class Talker:
 
     def _write_wave_file(self, filename: str, pcm_data: bytes, channels: int = 1, rate: int = 24000, sample_width: int = 2):
         """
-        Writes PCM audio data to a WAV file.
+        Writes PCM audio data to a WAV file, off the calling thread in the media pool.
 
         Args:
             filename (str): The name of the output WAV file.
@@ -28,11 +29,8 @@ class Talker:
             rate (int): Frame rate (samples per second).
             sample_width (int): Sample width in bytes.
         """
-        with wave.open(filename, "wb") as wf:
-            wf.setnchannels(channels)
-            wf.setsampwidth(sample_width)
-            wf.setframerate(rate)
-            wf.writeframes(pcm_data)
+        with stage("wav_encode"):
+            write_wave_file(filename, pcm_data, channels, rate, sample_width)
 
     def speak(self, message: str, output_filename: str = 'out.wav'):
         """
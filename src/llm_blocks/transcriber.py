@@ -5,6 +5,8 @@ class Transcriber:
     """
     A class to handle speech-to-text transcription using the Google Generative AI API.
     """
+    DEFAULT_PROMPT = "Generate a *transcript* of the speech. don't add any other text or reply in the transcript"
+
     def __init__(self, api_key: str):
         """
         Initializes the Transcriber class.
@@ -40,6 +42,48 @@ class Transcriber:
 
         return response.text
 
+    def transcribe_stream(self, file_path: str, prompt: str = DEFAULT_PROMPT):
+        """
+        Transcribes speech from an audio file, yielding the transcript as it arrives.
+
+        Args:
+            file_path (str): The path to the audio file (e.g., WAV).
+            prompt (str): The prompt for transcription. Defaults to DEFAULT_PROMPT.
+
+        Yields:
+            str: The transcript received so far.
+        """
+        myfile = self.client.files.upload(file=file_path)
+
+        try:
+            transcript = ""
+            for chunk in self.client.models.generate_content_stream(
+                model='gemini-2.0-flash',
+                contents=[prompt, myfile]
+            ):
+                if chunk.text:
+                    transcript += chunk.text
+                    yield transcript
+        finally:
+            # Delete the uploaded file after use
+            self.client.files.delete(name=myfile.name)
+
+    def transcribe(self, file_path: str, prompt: str = DEFAULT_PROMPT) -> str:
+        """
+        Transcribes speech from an audio file using the streaming endpoint.
+
+        Args:
+            file_path (str): The path to the audio file (e.g., WAV).
+            prompt (str): The prompt for transcription. Defaults to DEFAULT_PROMPT.
+
+        Returns:
+            str: The transcribed text.
+        """
+        transcript = ""
+        for transcript in self.transcribe_stream(file_path, prompt):
+            pass
+        return transcript.strip()
+
 if __name__ == '__main__':
     # Example Usage (requires a dummy 'out.wav' file for testing)
     # Create a dummy file for testing purposes if it doesn't exist
@@ -0,0 +1,207 @@
+import hmac
+import itertools
+import os
+import random
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+
+# Fraction of requests profiled without being asked to (0 disables sampling)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Shared secret for on-demand profiling; requests are only profiled on demand when
+# "X-Profile" / "?profile=" carries this value (unset disables on-demand profiling)
+PROFILE_REQUEST_TOKEN = os.getenv("PROFILE_REQUEST_TOKEN", "")
+# Where collapsed-stack profiles are written
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Seconds between stack samples
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+
+_active = threading.local()
+_profile_ids = itertools.count(1)
+
+
+class SamplingProfiler:
+    """
+    A low-overhead sampling profiler for a single request.
+
+    A background thread samples the stack of whichever thread is currently
+    running the request and counts collapsed stacks per stage. The result is
+    written in the folded format read by flamegraph.pl and speedscope.
+    """
+    def __init__(self, session_id: str, label: str, interval: float = PROFILE_INTERVAL):
+        """
+        Initializes the SamplingProfiler class.
+
+        Args:
+            session_id (str): Identifier of the user session, used in the output file names.
+            label (str): Name of the profiled request type (e.g. "chat").
+            interval (float): Seconds between samples. Defaults to PROFILE_INTERVAL.
+        """
+        self.session_id = session_id or "anonymous"
+        self.label = label
+        self.interval = interval
+        self.stage_name = "request"
+        self.samples = Counter()
+        self.profile_id = next(_profile_ids)
+        self._target = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample_loop, name=f"profiler-{self.session_id}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def attach(self):
+        """Start sampling the calling thread (a request may hop threads between generator steps)."""
+        self._target = threading.get_ident()
+        _active.profiler = self
+
+    def detach(self):
+        """Stop sampling the calling thread."""
+        self._target = None
+        _active.profiler = None
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            target = self._target
+            if target is None:
+                continue
+            frame = sys._current_frames().get(target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[(self.stage_name, ";".join(reversed(stack)))] += 1
+
+    def save(self) -> list:
+        """
+        Writes one folded-stack file per stage.
+
+        Returns:
+            list: Paths of the written files.
+        """
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        # Microseconds plus a per-process counter keep a session's concurrent requests apart
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        safe_session = "".join(c if c.isalnum() else "_" for c in self.session_id[:16])
+        by_stage = {}
+        for (stage_name, stack), count in self.samples.items():
+            by_stage.setdefault(stage_name, []).append(f"{self.label};{stage_name};{stack} {count}")
+
+        paths = []
+        for stage_name, lines in by_stage.items():
+            path = os.path.join(PROFILE_DIR, f"{timestamp}_{self.profile_id}_{safe_session}_{stage_name}.folded")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            paths.append(path)
+        print(f"Profile saved to: {', '.join(paths) if paths else '(no samples)'}")
+        return paths
+
+
+class stage:
+    """
+    Tags profile samples taken inside the block with a stage name.
+
+    It only looks up a thread-local, so it costs next to nothing when the
+    current request isn't being profiled.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self._profiler = None
+        self._previous = None
+
+    def __enter__(self):
+        self._profiler = getattr(_active, "profiler", None)
+        if self._profiler is not None:
+            self._previous = self._profiler.stage_name
+            self._profiler.stage_name = self.name
+        return self
+
+    def __exit__(self, *exc):
+        if self._profiler is not None:
+            self._profiler.stage_name = self._previous
+        return False
+
+
+def should_profile(request) -> bool:
+    """
+    Decides whether a request is profiled.
+
+    Args:
+        request: The gradio request, or None.
+
+    Returns:
+        bool: True for an "X-Profile" header or "?profile=" query flag matching
+            PROFILE_REQUEST_TOKEN, or a PROFILE_SAMPLE_RATE draw.
+    """
+    if request is not None and PROFILE_REQUEST_TOKEN:
+        flag = request.headers.get("x-profile") or request.query_params.get("profile")
+        if flag and hmac.compare_digest(flag.encode(), PROFILE_REQUEST_TOKEN.encode()):
+            return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def profile_generator(generator, request, label: str = "chat"):
+    """
+    Profiles a streaming handler if the request asks for it.
+
+    Args:
+        generator: The handler's generator.
+        request: The gradio request, or None.
+        label (str): Name of the request type. Defaults to "chat".
+
+    Returns:
+        The generator itself when not profiled, otherwise a wrapping generator.
+    """
+    if not should_profile(request):
+        return generator
+    return _profiled(generator, SamplingProfiler(getattr(request, "session_hash", None), label))
+
+
+def _profiled(generator, profiler):
+    profiler.start()
+    try:
+        while True:
+            profiler.attach()
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+            finally:
+                profiler.detach()
+            yield item
+    finally:
+        profiler.stop()
+        profiler.save()
+
+
+def profile_call(request, label: str, fn, *args, **kwargs):
+    """
+    Calls fn, profiling it if the request asks for it.
+
+    Args:
+        request: The gradio request, or None.
+        label (str): Name of the request type.
+        fn: The function to call.
+        *args, **kwargs: Arguments for fn.
+
+    Returns:
+        Whatever fn returns.
+    """
+    if not should_profile(request):
+        return fn(*args, **kwargs)
+    profiler = SamplingProfiler(getattr(request, "session_hash", None), label)
+    profiler.start()
+    profiler.attach()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.detach()
+        profiler.stop()
+        profiler.save()
@@ -0,0 +1,188 @@
+import re
+import zlib
+
+import numpy as np
+
+from src.tools.get_attraction_info import EGYPTIAN_ATTRACTIONS
+from src.tools.get_food_recommendations import EGYPTIAN_CUISINE
+from src.tools.get_transportation_info import TRANSPORTATION_INFO
+
+
+class HashedNgramEmbedder:
+    """
+    A local, network-free text embedder based on the hashing trick.
+
+    Words and character trigrams are hashed into a fixed number of buckets
+    with a stable hash (crc32), so the same text always maps to the same
+    vector across processes.
+    """
+    def __init__(self, dim: int = 512, ngram: int = 3):
+        """
+        Initializes the HashedNgramEmbedder class.
+
+        Args:
+            dim (int): Number of hash buckets (vector dimensions). Defaults to 512.
+            ngram (int): Character n-gram size. Defaults to 3.
+        """
+        self.dim = dim
+        self.ngram = ngram
+
+    def _features(self, text: str) -> list:
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        features = list(words)
+        for word in words:
+            padded = f"#{word}#"
+            features.extend(padded[i:i + self.ngram] for i in range(len(padded) - self.ngram + 1))
+        return features
+
+    def embed(self, texts: list) -> np.ndarray:
+        """
+        Embeds a batch of texts.
+
+        Args:
+            texts (list): The texts to embed.
+
+        Returns:
+            np.ndarray: A (len(texts), dim) float32 matrix of L2-normalized rows.
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                # The top bit picks the sign so collisions tend to cancel out
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors /= norms
+        return vectors
+
+
+class KnowledgeIndex:
+    """
+    An in-memory vector index answering top-k cosine-similarity queries.
+
+    Entry embeddings are kept in one contiguous float32 matrix, so a batch of
+    queries is scored with a single matrix multiplication.
+    """
+    def __init__(self, embedder: HashedNgramEmbedder = None):
+        """
+        Initializes the KnowledgeIndex class.
+
+        Args:
+            embedder (HashedNgramEmbedder): The embedder to use. Defaults to a 512-dim HashedNgramEmbedder.
+        """
+        self.embedder = embedder or HashedNgramEmbedder()
+        self.entries = []
+        self.matrix = np.zeros((0, self.embedder.dim), dtype=np.float32)
+
+    def add_entries(self, entries: list):
+        """
+        Adds entries to the index.
+
+        Args:
+            entries (list): Dicts with at least "category", "name" and "text" keys.
+                "text" is what gets embedded; the whole dict is returned on a hit.
+        """
+        if not entries:
+            return
+        vectors = self.embedder.embed([entry["text"] for entry in entries])
+        self.matrix = np.ascontiguousarray(np.vstack([self.matrix, vectors]))
+        self.entries.extend(entries)
+
+    def search_batch(self, queries: list, top_k: int = 3) -> list:
+        """
+        Finds the most similar entries for each query.
+
+        Args:
+            queries (list): The query strings.
+            top_k (int): Number of results per query. Defaults to 3.
+
+        Returns:
+            list: One list per query of (entry, score) tuples, best first.
+        """
+        if not self.entries or not queries:
+            return [[] for _ in queries]
+        top_k = max(1, min(top_k, len(self.entries)))
+        scores = self.embedder.embed(queries) @ self.matrix.T
+        # argpartition keeps this O(n) per query; only the top_k get sorted
+        candidates = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        results = []
+        for row, idx in enumerate(candidates):
+            ordered = idx[np.argsort(-scores[row, idx])]
+            results.append([(self.entries[i], float(scores[row, i])) for i in ordered])
+        return results
+
+    def search(self, query: str, top_k: int = 3) -> list:
+        """
+        Finds the most similar entries for a single query.
+
+        Args:
+            query (str): The query string.
+            top_k (int): Number of results. Defaults to 3.
+
+        Returns:
+            list: (entry, score) tuples, best first.
+        """
+        return self.search_batch([query], top_k)[0]
+
+
+def build_catalog_entries() -> list:
+    """Flatten the attraction, food and transportation catalogs into index entries."""
+    entries = []
+    for key, info in EGYPTIAN_ATTRACTIONS.items():
+        entries.append({
+            "category": "Attraction",
+            "name": info["name"],
+            "text": f"{key} {info['name']} {info['location']} {info['description']} {info['best_time']}",
+            "details": f"📍 {info['location']} | 🎫 {info['ticket_price']} | ⏰ {info['best_time']}\nℹ️ {info['description']}",
+        })
+    for key, info in EGYPTIAN_CUISINE.items():
+        entries.append({
+            "category": "Food",
+            "name": info["name"],
+            "text": f"{key.replace('_', ' ')} {info['name']} food dish {info['description']} {info['where_to_find']}",
+            "details": f"💰 {info['price_range']} | 📍 {info['where_to_find']}\n📝 {info['description']}",
+        })
+    for key, info in TRANSPORTATION_INFO.items():
+        details = info.get("routes", info.get("availability", "Available"))
+        entries.append({
+            "category": "Transportation",
+            "name": info["name"],
+            "text": f"{key.replace('_', ' ')} {info['name']} transport travel {details} {info['tips']}",
+            "details": f"💰 {info['price']} | ℹ️ {details}\n💡 {info['tips']}",
+        })
+    return entries
+
+
+# Matches must score at least MIN_RELEVANCE and at least RELATIVE_RELEVANCE of the best match
+MIN_RELEVANCE = 0.15
+RELATIVE_RELEVANCE = 0.75
+
+_knowledge_index = None
+
+
+def get_knowledge_index() -> KnowledgeIndex:
+    """Return the shared knowledge index, building it from the catalogs on first use."""
+    global _knowledge_index
+    if _knowledge_index is None:
+        _knowledge_index = KnowledgeIndex()
+        _knowledge_index.add_entries(build_catalog_entries())
+    return _knowledge_index
+
+
+def search_egypt_knowledge(query: str, top_k: int = 3) -> str:
+    """Search the Egypt knowledge base by meaning for attractions, food and transportation."""
+    print(f"Tool search_egypt_knowledge called for {query}")
+    results = get_knowledge_index().search(query, top_k)
+    if results:
+        # Hash collisions give unrelated entries small positive scores, so require real relevance
+        cutoff = max(MIN_RELEVANCE, results[0][1] * RELATIVE_RELEVANCE)
+        results = [(entry, score) for entry, score in results if score >= cutoff]
+
+    if not results:
+        return f"I couldn't find anything related to '{query}' in the Egypt knowledge base."
+
+    response = f"🔎 **Best matches for '{query}':**\n"
+    for entry, score in results:
+        response += f"\n**{entry['name']}** ({entry['category']}, relevance {score:.2f})\n{entry['details']}\n"
+    return response